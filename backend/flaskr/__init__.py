@@ -1,16 +1,131 @@
 import os
-from flask import Flask, request, abort, jsonify
+from flask import Flask, Response, request, abort, jsonify
+from flask.json import JSONEncoder
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
+import hashlib
+import orjson
+import re
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
 
-from models import setup_db, Question, Category
+from models import setup_db, db, Question, Category
 
 QUESTIONS_PER_PAGE = 10
+MIN_SEARCH_TERM_LENGTH = 2
+
+# error bodies never change, so they are serialized once at import time
+_ERROR_BODIES = {
+    code: orjson.dumps({'success': False, 'error': code, 'message': message})
+    for code, message in [
+        (400, 'bad request'),
+        (404, 'resource not found'),
+        (405, 'method not allowed'),
+        (422, 'unprocessable'),
+        (500, 'internal server error')
+    ]
+}
+
+def error_response(code):
+    return Response(_ERROR_BODIES[code], status=code, mimetype='application/json')
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    Serializes jsonify() responses with orjson instead of the stdlib encoder.
+    """
+    def encode(self, o):
+        # category dicts are keyed by integer ids
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(o, default=self.default, option=option).decode()
+
+# categories rarely change; reset 'v' to None in anything that mutates them
+_categories_cache = {'v': None, 'etag': None}
+
+def get_categories_dict():
+    # an empty table is not cached, so seeding it later is picked up
+    if not _categories_cache['v']:
+        categories = dict(db.session.query(Category.id, Category.type).all())
+        _categories_cache['etag'] = hashlib.md5(orjson.dumps(
+            categories,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        )).hexdigest()
+        _categories_cache['v'] = categories
+
+    return _categories_cache['v']
+
+def get_categories_etag():
+    get_categories_dict()
+
+    return _categories_cache['etag']
+
+# read-only listings load plain row tuples instead of Question instances
+QUESTION_COLUMNS = (
+    Question.id,
+    Question.question,
+    Question.answer,
+    Question.category,
+    Question.difficulty
+)
+
+def _row_to_dict(row):
+    return {
+        'id': row.id,
+        'question': row.question,
+        'answer': row.answer,
+        'category': row.category,
+        'difficulty': row.difficulty
+        }
+
+def escape_like(term):
+    # treat user input literally inside a LIKE pattern
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _to_int(value):
+    # accepts ints and strings of digits; bools, floats and anything else give None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and re.fullmatch('[0-9]+', value):
+        return int(value)
+
+    return None
+
+def paginate(request, query):
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        abort(400)
+
+    rows = query.with_entities(*QUESTION_COLUMNS) \
+        .limit(QUESTIONS_PER_PAGE).offset((page - 1) * QUESTIONS_PER_PAGE).all()
+
+    return [_row_to_dict(row) for row in rows]
+
+def paginate_keyset(request, query, order_col=Question.id):
+    after = request.args.get('after', type=int)
+    if after is None:
+        if 'after' in request.args:
+            abort(400)
+        after = 0
+
+    rows = query.with_entities(*QUESTION_COLUMNS) \
+        .filter(order_col > after).order_by(order_col.asc()) \
+        .limit(QUESTIONS_PER_PAGE + 1).all()
+
+    # the extra row only tells us whether another page exists
+    has_more = len(rows) > QUESTIONS_PER_PAGE
+    rows = rows[:QUESTIONS_PER_PAGE]
+    next_cursor = getattr(rows[-1], order_col.key) if has_more else None
+
+    return [_row_to_dict(row) for row in rows], next_cursor, has_more
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
+    app.json_encoder = OrjsonEncoder
     setup_db(app)
 
     """
@@ -22,81 +137,259 @@ def create_app(test_config=None):
     """
 
     """
-    @TODO:
-    Create an endpoint to handle GET requests
-    for all available categories.
+    GET /categories
+    Returns all categories as `id: type` pairs. Responds 304 with no
+    body when `If-None-Match` carries the current ETag.
     """
+    @app.route('/categories')
+    def show_categories():
+        categories_dict = get_categories_dict()
+        if len(categories_dict) == 0:
+            abort(404)
 
+        etag = get_categories_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            response = jsonify({
+                'success': True,
+                'categories': categories_dict
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, max-age=60'
 
-    """
-    @TODO:
-    Create an endpoint to handle GET requests for questions,
-    including pagination (every 10 questions).
-    This endpoint should return a list of questions,
-    number of total questions, current category, categories.
+        return response
 
-    TEST: At this point, when you start the application
-    you should see questions and categories generated,
-    ten questions per page and pagination at the bottom of the screen for three pages.
-    Clicking on the page numbers should update the questions.
     """
-
+    GET /questions?after=<id> or GET /questions?page=<page>
+    Returns a page of questions, the number of total questions,
+    the current category and all categories.
+    With `after` the page starts after the given question id and the
+    response carries `next_cursor` and `has_more`; `page` is kept for
+    existing clients.
     """
-    @TODO:
-    Create an endpoint to DELETE question using a question ID.
+    @app.route('/questions')
+    def show_questions():
+        total_questions = Question.query.count()
+        categories_dict = get_categories_dict()
 
-    TEST: When you click the trash icon next to a question, the question will be removed.
-    This removal will persist in the database and when you refresh the page.
-    """
+        if 'after' in request.args:
+            current_questions, next_cursor, has_more = \
+                paginate_keyset(request, Question.query)
 
-    """
-    @TODO:
-    Create an endpoint to POST a new question,
-    which will require the question and answer text,
-    category, and difficulty score.
+            return jsonify({
+                'success': True,
+                'questions': current_questions,
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'total_questions': total_questions,
+                'current_category': None,
+                'categories': categories_dict
+            })
 
-    TEST: When you submit a question on the "Add" tab,
-    the form will clear and the question will appear at the end of the last page
-    of the questions list in the "List" tab.
-    """
+        current_questions = paginate(request, Question.query.order_by(Question.id))
+        if len(current_questions) == 0:
+            abort(404)
 
-    """
-    @TODO:
-    Create a POST endpoint to get questions based on a search term.
-    It should return any questions for whom the search term
-    is a substring of the question.
+        return jsonify({
+            'success': True,
+            'questions': current_questions,
+            'total_questions': total_questions,
+            'current_category': None,
+            'categories': categories_dict
+        })
 
-    TEST: Search by any phrase. The questions list will update to include
-    only question that include that string within their question.
-    Try using the word "title" to start.
     """
+    DELETE /questions/<id>
+    Deletes the question and returns its id.
+    """
+    @app.route('/questions/<int:id>', methods=['DELETE'])
+    def delete_question(id):
+        question = Question.query.get(id)
+        if question is None:
+            abort(404)
+
+        try:
+            question.delete()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422)
+
+        return jsonify({
+            'success': True,
+            'deleted': id
+        })
 
     """
-    @TODO:
-    Create a GET endpoint to get questions based on category.
+    POST /questions
+    Creates a question from `question`, `answer`, `category` and
+    `difficulty` and returns its id with the new number of total
+    questions. The question list is not echoed back; clients refetch it.
+    """
+    @app.route('/questions', methods=['POST'])
+    def create_question():
+        body = request.get_json()
+        if not isinstance(body, dict):
+            abort(400)
+
+        new_question = body.get('question')
+        new_answer = body.get('answer')
+        new_category = body.get('category')
+        new_difficulty = body.get('difficulty')
+        if not (new_question and new_answer and new_category and new_difficulty):
+            abort(422)
+
+        # the add form posts category and difficulty as numeric strings
+        new_category = _to_int(new_category)
+        new_difficulty = _to_int(new_difficulty)
+        if new_category is None or new_difficulty is None:
+            abort(422)
+
+        question = Question(
+            question=new_question,
+            answer=new_answer,
+            category=new_category,
+            difficulty=new_difficulty
+        )
+        try:
+            question.insert()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422)
+
+        return jsonify({
+            'success': True,
+            'created': question.id,
+            'total_questions': Question.query.count()
+        })
 
-    TEST: In the "List" tab / main screen, clicking on one of the
-    categories in the left column will cause only questions of that
-    category to be shown.
     """
+    POST /questions/search
+    Returns a page of questions whose text contains `searchTerm`.
+    `%` and `_` in the term match literally; terms shorter than
+    MIN_SEARCH_TERM_LENGTH are rejected.
+    """
+    @app.route('/questions/search', methods=['POST'])
+    def search_questions():
+        body = request.get_json()
+        if not isinstance(body, dict) or not isinstance(body.get('searchTerm'), str):
+            abort(400)
+
+        search_term = body['searchTerm'].strip()
+        if len(search_term) < MIN_SEARCH_TERM_LENGTH:
+            abort(400)
 
+        query = Question.query.filter(
+            Question.question.ilike('%{}%'.format(escape_like(search_term)), escape='\\')
+        ).order_by(Question.id)
+        total_questions = query.count()
+
+        return jsonify({
+            'success': True,
+            'questions': paginate(request, query),
+            'total_questions': total_questions,
+            'current_category': None
+        })
+
+    """
+    GET /categories/<id>/questions?after=<id> or ?page=<page>
+    Returns a page of questions belonging to the given category,
+    with `next_cursor` and `has_more` when paging by `after`.
     """
-    @TODO:
-    Create a POST endpoint to get questions to play the quiz.
-    This endpoint should take category and previous question parameters
-    and return a random questions within the given category,
-    if provided, and that is not one of the previous questions.
+    @app.route('/categories/<int:id>/questions')
+    def show_questions_by_category(id):
+        category = Category.query.get(id)
+        if category is None:
+            abort(404)
+
+        query = Question.query.filter(Question.category == id)
+        total_questions = query.count()
+
+        if 'after' in request.args:
+            current_questions, next_cursor, has_more = \
+                paginate_keyset(request, query)
+
+            return jsonify({
+                'success': True,
+                'questions': current_questions,
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'total_questions': total_questions,
+                'current_category': category.type
+            })
+
+        return jsonify({
+            'success': True,
+            'questions': paginate(request, query.order_by(Question.id)),
+            'total_questions': total_questions,
+            'current_category': category.type
+        })
 
-    TEST: In the "Play" tab, after a user selects "All" or a category,
-    one question at a time is displayed, the user is allowed to answer
-    and shown whether they were correct or not.
     """
+    POST /quizzes
+    Returns a random question from `quiz_category` (id 0 means all
+    categories) that is not in `previous_questions`, or no question
+    once they have all been asked.
+    """
+    @app.route('/quizzes', methods=['POST'])
+    def get_quiz_question():
+        body = request.get_json()
+        if not isinstance(body, dict):
+            abort(400)
+
+        category = body.get('quiz_category')
+        previous_questions = body.get('previous_questions', [])
+        if not isinstance(category, dict) or not isinstance(previous_questions, list):
+            abort(400)
+        if any(isinstance(question_id, bool) or not isinstance(question_id, int)
+               for question_id in previous_questions):
+            abort(400)
+
+        # the frontend sends category ids as strings
+        category_id = _to_int(category.get('id'))
+        if category_id is None:
+            abort(400)
+        previous_questions = set(previous_questions)
+
+        query = Question.query
+        if category_id != 0:
+            query = query.filter(Question.category == category_id)
+        if previous_questions:
+            query = query.filter(~Question.id.in_(previous_questions))
+        question = query.order_by(func.random()).first()
+
+        return jsonify({
+            'success': True,
+            'question': question.format() if question is not None else None
+        })
 
     """
-    @TODO:
-    Create error handlers for all expected errors
-    including 404 and 422.
+    Error handlers
+    Every expected error returns `success`, `error` and `message` as JSON.
     """
+    @app.errorhandler(400)
+    def bad_request(error):
+        return error_response(400)
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return error_response(404)
+
+    @app.errorhandler(405)
+    def method_not_allowed(error):
+        response = error_response(405)
+        # every 405 must list the allowed methods (RFC 7231)
+        response.headers['Allow'] = ', '.join(error.valid_methods or [])
+
+        return response
+
+    @app.errorhandler(422)
+    def unprocessable(error):
+        return error_response(422)
+
+    @app.errorhandler(500)
+    def internal_server_error(error):
+        return error_response(500)
 
     return app
 
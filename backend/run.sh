@@ -0,0 +1,10 @@
+#!/bin/sh
+# Serve the API with Gunicorn gevent workers, one per CPU.
+# The gevent monitor thread logs any greenlet that blocks the event loop
+# for more than 100ms to gevent-blocking.log.
+export GEVENT_MONITOR_THREAD_ENABLE=1
+export GEVENT_MAX_BLOCKING_TIME="${GEVENT_MAX_BLOCKING_TIME:-0.1}"
+export GEVENT_MONITOR_LOG="${GEVENT_MONITOR_LOG:-gevent-blocking.log}"
+
+exec gunicorn -k gevent -w "$(nproc)" --worker-connections 1000 \
+    -b 0.0.0.0:8080 wsgi:app
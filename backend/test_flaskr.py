@@ -1,40 +1,381 @@
 import os
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
 
+from sqlalchemy import event
+
+import flaskr
 from flaskr import create_app
-from models import setup_db, Question, Category
+from models import setup_db, db, Question, Category
 
 
 class TriviaTestCase(unittest.TestCase):
     """This class represents the trivia test case"""
 
+    @classmethod
+    def setUpClass(cls):
+        """Initialize the app and create the tables once for the whole class."""
+        cls.database_name = "trivia_test"
+        cls.database_path = "postgresql://{}/{}".format('localhost:5432', cls.database_name)
+        cls.app = create_app()
+        setup_db(cls.app, cls.database_path)
+
+        with cls.app.app_context():
+            db.create_all()
+
     def setUp(self):
-        """Define test variables and initialize app."""
-        self.app = create_app()
+        """Run each test inside a transaction that tearDown rolls back."""
         self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-    
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+        # The session works inside a SAVEPOINT nested in the outer transaction.
+        # When an endpoint commits, the savepoint is released; when it rolls
+        # back, only the savepoint is undone. Either way a fresh savepoint is
+        # opened, and tearDown rolls back the outer transaction.
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+        self.nested = self.connection.begin_nested()
+        self.session = db.session
+        db.session = db.create_scoped_session(options={'bind': self.connection, 'binds': {}})
+
+        @event.listens_for(db.session, 'after_transaction_end')
+        def restart_savepoint(session, transaction):
+            if transaction.parent is None:
+                if self.nested.is_active:
+                    self.nested.commit()
+                self.nested = self.connection.begin_nested()
+
     def tearDown(self):
         """Executed after reach test"""
-        pass
+        db.session.remove()
+        db.session = self.session
+        self.transaction.rollback()
+        self.connection.close()
+        self.ctx.pop()
+
+    def test_get_categories(self):
+        res = self.client().get('/categories')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertTrue(len(data['categories']))
+
+    def test_empty_categories_cache_is_refilled(self):
+        flaskr._categories_cache['v'] = {}
+        res = self.client().get('/categories')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(len(data['categories']))
+
+    def test_get_categories_not_modified(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_get_categories_not_modified_weak_etag(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories', headers={'If-None-Match': 'W/' + etag})
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_405_post_categories(self):
+        res = self.client().post('/categories')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 405)
+        self.assertFalse(data['success'])
+        self.assertEqual(data['message'], 'method not allowed')
+        self.assertIn('GET', res.headers['Allow'])
+
+    def test_get_paginated_questions(self):
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertTrue(data['total_questions'])
+        self.assertTrue(len(data['questions']))
+        self.assertTrue(len(data['categories']))
+
+    def test_404_requesting_beyond_valid_page(self):
+        res = self.client().get('/questions?page=1000')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(data['success'])
+
+    def test_400_page_below_one(self):
+        for url in ['/questions?page=0', '/categories/1/questions?page=-1']:
+            res = self.client().get(url)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 400)
+            self.assertFalse(data['success'])
+
+        res = self.client().post('/questions/search?page=0', json={'searchTerm': 'title'})
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_questions_after_cursor(self):
+        res = self.client().get('/questions?after=0')
+        first = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(first['success'])
+        self.assertTrue(first['has_more'])
+        self.assertEqual(first['next_cursor'], first['questions'][-1]['id'])
+
+        res = self.client().get('/questions?after={}'.format(first['next_cursor']))
+        second = json.loads(res.data)
+        first_ids = [q['id'] for q in first['questions']]
+        second_ids = [q['id'] for q in second['questions']]
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(len(second_ids))
+        self.assertTrue(min(second_ids) > max(first_ids))
+        if second['has_more']:
+            self.assertEqual(second['next_cursor'], second_ids[-1])
+        else:
+            self.assertIsNone(second['next_cursor'])
+
+    def test_400_invalid_after_cursor(self):
+        res = self.client().get('/questions?after=abc')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(data['success'])
+
+    def test_delete_question(self):
+        question = Question('question', 'answer', 1, 1)
+        question.insert()
+
+        res = self.client().delete('/questions/{}'.format(question.id))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['deleted'], question.id)
+        self.assertIsNone(Question.query.get(question.id))
+
+    def test_404_delete_missing_question(self):
+        res = self.client().delete('/questions/100000')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(data['success'])
+
+    def test_create_question(self):
+        total_before = Question.query.count()
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': 1,
+            'difficulty': 1
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertTrue(data['created'])
+        self.assertEqual(data['total_questions'], total_before + 1)
+
+    def test_422_create_incomplete_question(self):
+        res = self.client().post('/questions', json={'question': 'question'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertFalse(data['success'])
+
+    def test_422_create_question_in_missing_category(self):
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': 1000,
+            'difficulty': 1
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertFalse(data['success'])
+
+    def test_failed_insert_only_rolls_back_to_the_savepoint(self):
+        total_before = Question.query.count()
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': 1,
+            'difficulty': 1
+        })
+        created = json.loads(res.data)['created']
+
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': 1000,
+            'difficulty': 1
+        })
+
+        self.assertEqual(res.status_code, 422)
+        self.assertIsNotNone(Question.query.get(created))
+        self.assertEqual(Question.query.count(), total_before + 1)
+
+    def test_422_create_question_with_non_numeric_difficulty(self):
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': 1,
+            'difficulty': 'hard'
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertFalse(data['success'])
+
+    def test_422_create_question_with_float_or_bool_fields(self):
+        for category, difficulty in [(2.9, 1), (1, True), (True, 1), (1, 2.5)]:
+            res = self.client().post('/questions', json={
+                'question': 'question',
+                'answer': 'answer',
+                'category': category,
+                'difficulty': difficulty
+            })
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 422)
+            self.assertFalse(data['success'])
+
+    def test_create_question_with_string_fields(self):
+        res = self.client().post('/questions', json={
+            'question': 'question',
+            'answer': 'answer',
+            'category': '2',
+            'difficulty': '3'
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(Question.query.get(data['created']).category, 2)
+
+    def test_search_questions(self):
+        res = self.client().post('/questions/search', json={'searchTerm': 'title'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertTrue(len(data['questions']))
+
+    def test_search_wildcards_match_literally(self):
+        res = self.client().post('/questions/search', json={'searchTerm': '%%'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['total_questions'], 0)
+
+    def test_400_search_short_term(self):
+        res = self.client().post('/questions/search', json={'searchTerm': 'a'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(data['success'])
+
+    def test_400_search_malformed_body(self):
+        for body in [{'searchTerm': 123}, {'searchTerm': None}, ['title'], 'title']:
+            res = self.client().post('/questions/search', json=body)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 400)
+            self.assertFalse(data['success'])
+
+    def test_get_questions_by_category(self):
+        res = self.client().get('/categories/1/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['current_category'], Category.query.get(1).type)
+        self.assertTrue(all(q['category'] == 1 for q in data['questions']))
+
+    def test_get_questions_by_category_after_cursor(self):
+        ids = [q.id for q in Question.query.filter(Question.category == 2).order_by(Question.id)]
+        res = self.client().get('/categories/2/questions?after={}'.format(ids[0]))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([q['id'] for q in data['questions']], ids[1:])
+        self.assertFalse(data['has_more'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_404_questions_by_missing_category(self):
+        res = self.client().get('/categories/1000/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(data['success'])
+
+    def test_get_quiz_question(self):
+        res = self.client().post('/quizzes', json={
+            'previous_questions': [],
+            'quiz_category': {'type': 'Science', 'id': 1}
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['question']['category'], 1)
+
+    def test_quiz_ends_when_all_questions_asked(self):
+        asked = [q.id for q in Question.query.filter(Question.category == 1)]
+        res = self.client().post('/quizzes', json={
+            'previous_questions': asked,
+            'quiz_category': {'type': 'Science', 'id': 1}
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(data['question'])
+
+    def test_400_quiz_without_category(self):
+        res = self.client().post('/quizzes', json={'previous_questions': []})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(data['success'])
+
+    def test_get_quiz_question_with_string_category_id(self):
+        res = self.client().post('/quizzes', json={
+            'previous_questions': [],
+            'quiz_category': {'type': 'Science', 'id': '1'}
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['category'], 1)
+
+    def test_400_quiz_malformed_body(self):
+        bodies = [
+            {'quiz_category': None},
+            {'quiz_category': {}},
+            {'quiz_category': {'id': 'x'}},
+            {'quiz_category': {'id': 1.7}},
+            {'quiz_category': {'id': True}},
+            {'quiz_category': {'id': 1}, 'previous_questions': 'abc'},
+            {'quiz_category': {'id': 1}, 'previous_questions': ['x']},
+            {'quiz_category': {'id': 1}, 'previous_questions': [True]},
+            []
+        ]
+        for body in bodies:
+            res = self.client().post('/quizzes', json=body)
+            data = json.loads(res.data)
 
-    """
-    TODO
-    Write at least one test for each test for successful operation and for expected errors.
-    """
+            self.assertEqual(res.status_code, 400)
+            self.assertFalse(data['success'])
 
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
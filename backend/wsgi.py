@@ -0,0 +1,25 @@
+import logging
+import os
+
+from gevent import events
+from psycogreen.gevent import patch_psycopg
+
+from flaskr import create_app
+
+# let psycopg2 yield to other greenlets while waiting on Postgres
+patch_psycopg()
+
+blocking_log = os.environ.get('GEVENT_MONITOR_LOG')
+if blocking_log:
+    logger = logging.getLogger('gevent.monitor')
+    logger.addHandler(logging.FileHandler(blocking_log))
+
+    def log_blocked(event):
+        # reported by the monitor thread when a greenlet holds the hub
+        # longer than GEVENT_MAX_BLOCKING_TIME
+        if isinstance(event, events.EventLoopBlocked):
+            logger.warning('\n'.join(event.info))
+
+    events.subscribers.append(log_blocked)
+
+app = create_app()